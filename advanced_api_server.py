@@ -8,19 +8,28 @@ Advanced API endpoints with versioning, authentication, and enhanced features
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 import asyncio
 import aiohttp
 import time
 import json
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Tuple, NamedTuple, Iterator, Callable, Awaitable
 from pydantic import BaseModel, Field
 from enum import Enum
 import logging
 import jwt
 import hashlib
+import sqlite3
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from metrics_sketches import DDSketch, WindowedCounter, WindowedSketch
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +69,7 @@ class BatchRequestModel(BaseModel):
     requests: List[RequestModel] = Field(..., description="List of requests to process")
     parallel_execution: bool = Field(True, description="Execute requests in parallel")
     max_concurrent: int = Field(10, description="Maximum concurrent requests")
+    stream: bool = Field(False, description="Stream one NDJSON line per item as it completes")
 
 class ResponseModel(BaseModel):
     request_id: str
@@ -89,6 +99,7 @@ class MetricsModel(BaseModel):
     uptime_seconds: int
     memory_usage_mb: float
     cpu_usage_percent: float
+    latency_percentiles: Optional[Dict[str, float]] = None
 
 class UserModel(BaseModel):
     username: str
@@ -102,17 +113,1051 @@ class UserModel(BaseModel):
 security = HTTPBearer()
 SECRET_KEY = "parallelmind-engine-secret-key-2025"
 
+class TokenBucketRateLimiter:
+    """Per-key token buckets: O(1) checks, constant memory per key
+    
+    Each key holds `capacity` tokens refilled continuously over `window`
+    seconds, so a user with rate_limit=1000 gets 1000 requests per hour
+    with bursts up to the full allowance.
+    """
+    
+    def __init__(self, window: float = 3600.0):
+        self.window = window
+        self.buckets: Dict[str, List[float]] = {}  # key -> [tokens, last_refill]
+    
+    def _refill(self, key: str, capacity: int, now: float) -> List[float]:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(capacity), now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / self.window)
+            bucket[1] = now
+        return bucket
+    
+    def try_acquire(self, key: str, capacity: int, tokens: int = 1) -> bool:
+        """Take `tokens` at once, all or nothing"""
+        bucket = self._refill(key, capacity, time.time())
+        if bucket[0] < tokens:
+            return False
+        
+        bucket[0] -= tokens
+        return True
+    
+    def refund(self, key: str, capacity: int, tokens: int = 1):
+        """Give back tokens charged for work that was never accepted"""
+        bucket = self._refill(key, capacity, time.time())
+        bucket[0] = min(capacity, bucket[0] + tokens)
+    
+    def remaining(self, key: str, capacity: int) -> int:
+        return int(self._refill(key, capacity, time.time())[0])
+
+class Authenticator:
+    """Credential checks for API keys and JWTs
+    
+    API keys are indexed by their SHA-256 digest. Lookups hash the presented
+    token first, so any timing difference in the dict comparison reveals
+    digest bytes, never key bytes; no separate constant-time compare is
+    needed. Verified JWTs are remembered
+    by token digest until their `exp`, in a bounded LRU, so repeat
+    requests skip signature verification entirely.
+    """
+    
+    def __init__(self, secret_key: str, max_cached_tokens: int = 10000):
+        self.secret_key = secret_key
+        self.max_cached_tokens = max_cached_tokens
+        self.api_keys: Dict[bytes, str] = {}  # key digest -> username
+        self.key_digests: Dict[str, bytes] = {}  # username -> current key digest
+        self.token_cache: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()  # digest -> (username, exp)
+        self.stats = {"key_hits": 0, "token_cache_hits": 0, "token_verifications": 0, "failures": 0}
+    
+    @staticmethod
+    def digest(value: str) -> bytes:
+        """SHA-256 digest under which an API key (or token) is indexed"""
+        return hashlib.sha256(value.encode()).digest()
+    
+    def register(self, user: UserModel):
+        """Index a user's API key, replacing any previous one"""
+        self.register_digest(user.username, self.digest(user.api_key))
+    
+    def register_digest(self, username: str, digest: bytes):
+        """Index an API key known only by its digest (e.g. loaded from shared state)"""
+        previous = self.key_digests.get(username)
+        if previous is not None:
+            self.api_keys.pop(previous, None)
+        
+        self.api_keys[digest] = username
+        self.key_digests[username] = digest
+    
+    def authenticate(self, token: str) -> Optional[str]:
+        """Username for an API key or JWT, None if the credential is invalid"""
+        digest = self.digest(token)
+        now = time.time()
+        
+        cached = self.token_cache.get(digest)
+        if cached is not None:
+            if cached[1] > now:
+                self.token_cache.move_to_end(digest)
+                self.stats["token_cache_hits"] += 1
+                return cached[0]
+            del self.token_cache[digest]
+        
+        username = self.api_keys.get(digest)
+        if username is not None:
+            self.stats["key_hits"] += 1
+            return username
+        
+        try:
+            self.stats["token_verifications"] += 1
+            payload = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            self.stats["failures"] += 1
+            return None
+        
+        username = payload.get("username")
+        if not username:
+            self.stats["failures"] += 1
+            return None
+        
+        # Tokens without an expiry are re-verified after an hour
+        self.token_cache[digest] = (username, float(payload.get("exp", now + 3600)))
+        if len(self.token_cache) > self.max_cached_tokens:
+            self.token_cache.popitem(last=False)
+        return username
+
+def latency_summary(sketch: DDSketch) -> Dict[str, float]:
+    """Count, mean, p50/p95/p99 and max of a latency sketch"""
+    return {
+        "count": sketch.count,
+        "mean": sketch.mean(),
+        "p50": sketch.quantile(0.5),
+        "p95": sketch.quantile(0.95),
+        "p99": sketch.quantile(0.99),
+        "max": sketch.max
+    }
+
+class RequestRateWindow:
+    """Last-minute requests, errors and latency from per-second ring buckets
+    
+    Recording is O(1); reads merge at most `window_seconds` buckets.
+    """
+    
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.latency = WindowedSketch(window_seconds)
+        self.errors = WindowedCounter(window_seconds)
+    
+    def record(self, processing_time: float, success: bool, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.latency.observe(now, processing_time)
+        if not success:
+            self.errors.add(now)
+    
+    def requests_per_second(self, now: Optional[float] = None) -> float:
+        return self.latency.rate(time.time() if now is None else now)
+    
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        latency = self.latency.sketch(now)
+        errors = self.errors.total(now)
+        
+        return {
+            "window_seconds": self.window_seconds,
+            "requests": latency.count,
+            "errors": errors,
+            "requests_per_second": latency.count / self.window_seconds,
+            "error_rate": errors / latency.count if latency.count else 0.0,
+            "latency": latency_summary(latency)
+        }
+
+class AggregateStats:
+    """Request count, error count and latency sketch for one slice of traffic"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = DDSketch()
+    
+    def record(self, processing_time: float, success: bool):
+        self.requests += 1
+        if not success:
+            self.errors += 1
+        self.latency.add(processing_time)
+    
+    def merge(self, other: "AggregateStats"):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.latency.merge(other.latency)
+    
+    def summary(self) -> Dict[str, Any]:
+        latency = latency_summary(self.latency)
+        return {
+            "requests": self.requests,
+            "success_rate": (self.requests - self.errors) / self.requests if self.requests else 0.0,
+            "average_response_time": latency["mean"],
+            "p50": latency["p50"],
+            "p95": latency["p95"],
+            "p99": latency["p99"]
+        }
+
+class AnalyticsBucket:
+    """Aggregates for one time bucket, overall and per mode, priority and user"""
+    
+    DIMENSIONS = ("mode", "priority", "user")
+    
+    def __init__(self):
+        self.overall = AggregateStats()
+        self.by: Dict[str, Dict[str, AggregateStats]] = {dimension: {} for dimension in self.DIMENSIONS}
+    
+    def record(self, processing_time: float, success: bool, **labels: str):
+        self.overall.record(processing_time, success)
+        for dimension, value in labels.items():
+            stats = self.by[dimension].get(value)
+            if stats is None:
+                stats = self.by[dimension][value] = AggregateStats()
+            stats.record(processing_time, success)
+    
+    def merge(self, other: "AnalyticsBucket"):
+        self.overall.merge(other.overall)
+        for dimension, slices in other.by.items():
+            mine = self.by[dimension]
+            for value, stats in slices.items():
+                if value not in mine:
+                    mine[value] = AggregateStats()
+                mine[value].merge(stats)
+
+class AnalyticsRollup:
+    """Incrementally maintained analytics with minute, hour and day rollups
+    
+    Completed requests are folded into the current bucket of every
+    resolution (plus a lifetime bucket) as they finish. Range queries merge
+    only the buckets of the finest resolution that still covers the range,
+    so cost depends on bucket count, never on traffic volume.
+    """
+    
+    # name -> (bucket seconds, buckets retained)
+    RESOLUTIONS = {
+        "minute": (60, 24 * 60),
+        "hour": (3600, 30 * 24),
+        "day": (86400, 365)
+    }
+    MAX_MERGED_BUCKETS = 24 * 60
+    
+    def __init__(self):
+        self.lifetime = AnalyticsBucket()
+        self.buckets: Dict[str, "OrderedDict[int, AnalyticsBucket]"] = {
+            name: OrderedDict() for name in self.RESOLUTIONS
+        }
+    
+    def record(self, timestamp: float, processing_time: float, success: bool,
+               mode: str, priority: str, user: str):
+        self.lifetime.record(processing_time, success, mode=mode, priority=priority, user=user)
+        
+        for name, (width, retained) in self.RESOLUTIONS.items():
+            buckets = self.buckets[name]
+            start = int(timestamp // width) * width
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = AnalyticsBucket()
+                while len(buckets) > retained:
+                    buckets.popitem(last=False)
+            bucket.record(processing_time, success, mode=mode, priority=priority, user=user)
+    
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[AnalyticsBucket, Optional[str]]:
+        """Merged aggregates for [start, end) and the resolution used (None for lifetime)"""
+        if start is None and end is None:
+            return self.lifetime, None
+        
+        now = time.time()
+        end = now if end is None else end
+        start = 0.0 if start is None else start
+        
+        resolution = "day"
+        for name, (width, retained) in self.RESOLUTIONS.items():
+            covers = start >= (int(now // width) - retained + 1) * width
+            if covers and (end - start) / width <= self.MAX_MERGED_BUCKETS:
+                resolution = name
+                break
+        
+        # Buckets overlapping the range are included whole
+        width = self.RESOLUTIONS[resolution][0]
+        merged = AnalyticsBucket()
+        for bucket_start, bucket in self.buckets[resolution].items():
+            if bucket_start + width > start and bucket_start < end:
+                merged.merge(bucket)
+        return merged, resolution
+
+class HistoryRecord(NamedTuple):
+    """Compact completed-request record kept in RequestHistory"""
+    seq: int
+    request_id: str
+    user: str
+    status: str
+    mode: str
+    priority: str
+    processing_time: float
+    timestamp: float
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    
+    def to_response(self) -> ResponseModel:
+        return ResponseModel(
+            request_id=self.request_id,
+            status=self.status,
+            result=self.result,
+            error=self.error,
+            processing_time=self.processing_time,
+            mode=self.mode,
+            priority=self.priority,
+            timestamp=datetime.fromtimestamp(self.timestamp).isoformat()
+        )
+
+class RequestHistory:
+    """Fixed-capacity ring buffer of completed requests
+    
+    Records live in slot `seq % capacity` and are indexed by request_id, so
+    status lookups are O(1) and memory is bounded. Pagination walks
+    sequence numbers newest-first from an opaque cursor. With a spill path,
+    overwritten records move to SQLite and stay reachable by id and cursor.
+    
+    Evicted records wait in memory (still readable) until `flush` writes
+    them in one transaction; the server calls it from its background sync
+    off the event loop, and `add` only flushes inline as a backstop when
+    SPILL_FLUSH_LIMIT records are waiting.
+    """
+    
+    SPILL_FLUSH_LIMIT = 4096
+    
+    def __init__(self, capacity: int = 10000, spill_path: Optional[str] = None):
+        self.capacity = capacity
+        self.slots: List[Optional[HistoryRecord]] = [None] * capacity
+        self.index: Dict[str, int] = {}  # request_id -> seq
+        self.next_seq = 0
+        
+        self.spill_db: Optional[sqlite3.Connection] = None
+        self._unflushed: "OrderedDict[str, HistoryRecord]" = OrderedDict()  # evicted, oldest first
+        self._unflushed_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        if spill_path:
+            self.spill_db = sqlite3.connect(spill_path, check_same_thread=False)
+            self.spill_db.execute("PRAGMA journal_mode=WAL")
+            self.spill_db.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "seq INTEGER PRIMARY KEY, request_id TEXT UNIQUE, record TEXT)"
+            )
+            row = self.spill_db.execute("SELECT MAX(seq) FROM history").fetchone()
+            if row[0] is not None:
+                self.next_seq = row[0] + 1
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    @property
+    def total(self) -> int:
+        """Records ever added, including overwritten and spilled ones"""
+        return self.next_seq
+    
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.next_seq - self.capacity)
+    
+    def add(self, request_id: str, user: str, status: str, mode: str, priority: str,
+            processing_time: float, result: Optional[Dict[str, Any]] = None,
+            error: Optional[str] = None) -> HistoryRecord:
+        seq = self.next_seq
+        self.next_seq += 1
+        slot = seq % self.capacity
+        
+        evicted = self.slots[slot]
+        if evicted is not None:
+            self.index.pop(evicted.request_id, None)
+            self._spill(evicted)
+        
+        record = HistoryRecord(seq, request_id, user, status, mode, priority,
+                               processing_time, time.time(), result, error)
+        self.slots[slot] = record
+        self.index[request_id] = seq
+        return record
+    
+    def get(self, request_id: str) -> Optional[HistoryRecord]:
+        seq = self.index.get(request_id)
+        if seq is not None:
+            return self.slots[seq % self.capacity]
+        
+        record = self._unflushed.get(request_id)
+        if record is not None:
+            return record
+        
+        if self.spill_db is not None:
+            with self._db_lock:
+                row = self.spill_db.execute(
+                    "SELECT record FROM history WHERE request_id = ?", (request_id,)
+                ).fetchone()
+            if row:
+                return HistoryRecord(*json.loads(row[0]))
+        return None
+    
+    def page(self, cursor: Optional[int] = None, limit: int = 100) -> Tuple[List[HistoryRecord], Optional[int]]:
+        """Records older than `cursor` (a seq), newest first, plus the next cursor"""
+        start = self.next_seq if cursor is None else min(cursor, self.next_seq)
+        records = []
+        
+        seq = start - 1
+        while seq >= self.oldest_seq and len(records) < limit:
+            record = self.slots[seq % self.capacity]
+            if record is not None and record.seq == seq:
+                records.append(record)
+            seq -= 1
+        
+        if len(records) < limit and self.spill_db is not None:
+            # Unflushed records are newer than everything already on disk
+            with self._unflushed_lock:
+                unflushed = list(self._unflushed.values())
+            for record in reversed(unflushed):
+                if len(records) == limit:
+                    break
+                if record.seq <= seq:
+                    records.append(record)
+                    seq = record.seq - 1
+            
+            if len(records) < limit:
+                with self._db_lock:
+                    rows = self.spill_db.execute(
+                        "SELECT record FROM history WHERE seq <= ? ORDER BY seq DESC LIMIT ?",
+                        (seq, limit - len(records))
+                    ).fetchall()
+                records.extend(HistoryRecord(*json.loads(row[0])) for row in rows)
+        
+        next_cursor = records[-1].seq if len(records) == limit and records[-1].seq > 0 else None
+        return records, next_cursor
+    
+    def records(self) -> Iterator[HistoryRecord]:
+        """In-memory records, oldest first"""
+        for seq in range(self.oldest_seq, self.next_seq):
+            record = self.slots[seq % self.capacity]
+            if record is not None and record.seq == seq:
+                yield record
+    
+    def _spill(self, record: HistoryRecord):
+        if self.spill_db is None:
+            return
+        
+        with self._unflushed_lock:
+            self._unflushed[record.request_id] = record
+            backlog = len(self._unflushed)
+        if backlog >= self.SPILL_FLUSH_LIMIT:
+            self.flush()
+    
+    def flush(self):
+        """Write and commit spilled records; blocks, so call it off the event loop"""
+        if self.spill_db is None:
+            return
+        
+        with self._unflushed_lock:
+            records = list(self._unflushed.values())
+        if not records:
+            return
+        
+        with self._db_lock:
+            self.spill_db.executemany(
+                "INSERT OR REPLACE INTO history (seq, request_id, record) VALUES (?, ?, ?)",
+                [(record.seq, record.request_id, json.dumps(record, default=str)) for record in records]
+            )
+            self.spill_db.commit()
+        
+        # Readable from disk now
+        with self._unflushed_lock:
+            for record in records:
+                self._unflushed.pop(record.request_id, None)
+    
+    def close(self):
+        if self.spill_db is not None:
+            self.flush()
+            with self._db_lock:
+                self.spill_db.close()
+                self.spill_db = None
+
+class JobQueue:
+    """Background jobs, admitted in FairScheduler order
+    
+    Each job runs as its own task that waits in its tenant's scheduler lane,
+    so jobs start in deficit-round-robin order rather than submission order,
+    and the scheduler's slots bound how many run at once. There is no FIFO
+    worker pool for one tenant's backlog to occupy. submit() refuses new
+    work once `max_queued` jobs are outstanding.
+    """
+    
+    def __init__(self, runner: Callable[..., Awaitable[Any]], max_queued: int = 10000):
+        self.runner = runner
+        self.max_queued = max_queued
+        self.tasks: Dict[str, asyncio.Task] = {}
+    
+    def full(self) -> bool:
+        return len(self.tasks) >= self.max_queued
+    
+    def submit(self, job_id: str, *args: Any) -> bool:
+        if self.full():
+            return False
+        
+        task = asyncio.ensure_future(self._run(job_id, *args))
+        self.tasks[job_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job_id, None))
+        return True
+    
+    async def _run(self, job_id: str, *args: Any):
+        try:
+            await self.runner(job_id, *args)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "outstanding": len(self.tasks),
+            "max_queued": self.max_queued
+        }
+    
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+class FairScheduler:
+    """Deficit round robin admission across users, weighted by tier
+    
+    At most `total_slots` requests run at once, and each user at most their
+    tier's cap. Waiting users are served in DRR order, and each visit
+    earns `weight` admissions, so a large batch from one tenant cannot
+    starve the others. Within a user, higher priority lanes go first.
+    """
+    
+    PRIORITY_ORDER = ("critical", "high", "medium", "low")
+    
+    def __init__(self, total_slots: int = 64, tier_weights: Optional[Dict[str, int]] = None,
+                 tier_limits: Optional[Dict[str, int]] = None):
+        self.total_slots = total_slots
+        self.tier_weights = tier_weights or {"free": 1, "pro": 4, "enterprise": 8}
+        self.tier_limits = tier_limits or {"free": 4, "pro": 16, "enterprise": 32}
+        self.in_flight = 0
+        self.tenants: Dict[str, Dict[str, Any]] = {}
+        self.ring: deque = deque()  # usernames with waiting requests, in service order
+        self.stats = {"admitted": 0, "queued": 0, "cancelled_while_queued": 0}
+    
+    def _tenant(self, username: str, tier: str) -> Dict[str, Any]:
+        tenant = self.tenants.get(username)
+        if tenant is None:
+            tenant = self.tenants[username] = {
+                "tier": tier,
+                "in_flight": 0,
+                "deficit": 0,
+                "lanes": {priority: deque() for priority in self.PRIORITY_ORDER}
+            }
+        return tenant
+    
+    def _under_cap(self, tenant: Dict[str, Any]) -> bool:
+        return tenant["in_flight"] < self.tier_limits.get(tenant["tier"], self.total_slots)
+    
+    @staticmethod
+    def _next_waiter(tenant: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Highest-priority waiter, discarding ones cancelled while queued"""
+        for lane in tenant["lanes"].values():
+            while lane:
+                future = lane.popleft()
+                if not future.done():
+                    return future
+        return None
+    
+    @staticmethod
+    def _has_waiters(tenant: Dict[str, Any]) -> bool:
+        return any(lane for lane in tenant["lanes"].values())
+    
+    @asynccontextmanager
+    async def slot(self, username: str, tier: str, priority: str = "medium"):
+        """Hold one admission for the duration of the block"""
+        await self.acquire(username, tier, priority)
+        try:
+            yield
+        finally:
+            self.release(username)
+    
+    async def acquire(self, username: str, tier: str, priority: str = "medium"):
+        tenant = self._tenant(username, tier)
+        
+        # Fast path: idle capacity and nobody waiting ahead
+        if not self.ring and self.in_flight < self.total_slots and self._under_cap(tenant):
+            self._admit(tenant)
+            return
+        
+        future = asyncio.get_event_loop().create_future()
+        tenant["lanes"].get(priority, tenant["lanes"]["medium"]).append(future)
+        if username not in self.ring:
+            self.ring.append(username)
+        self.stats["queued"] += 1
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted in the same tick we were cancelled: give the slot back
+                self.release(username)
+            else:
+                self.stats["cancelled_while_queued"] += 1
+                self._forget_if_idle(username)
+            raise
+    
+    def release(self, username: str):
+        tenant = self.tenants.get(username)
+        if tenant is not None:
+            tenant["in_flight"] -= 1
+        self.in_flight -= 1
+        self._forget_if_idle(username)
+        self._dispatch()
+    
+    def _admit(self, tenant: Dict[str, Any]):
+        tenant["in_flight"] += 1
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+    
+    def _dispatch(self):
+        skipped = 0
+        while self.ring and self.in_flight < self.total_slots and skipped < len(self.ring):
+            username = self.ring[0]
+            tenant = self.tenants[username]
+            
+            if not self._under_cap(tenant):
+                self.ring.rotate(-1)
+                skipped += 1
+                continue
+            
+            future = self._next_waiter(tenant)
+            if future is None:
+                self.ring.popleft()
+                tenant["deficit"] = 0
+                self._forget_if_idle(username)
+                continue
+            
+            if tenant["deficit"] < 1:
+                tenant["deficit"] += self.tier_weights.get(tenant["tier"], 1)
+            tenant["deficit"] -= 1
+            self._admit(tenant)
+            future.set_result(None)
+            skipped = 0
+            
+            if not self._has_waiters(tenant):
+                self.ring.popleft()
+                tenant["deficit"] = 0
+            elif tenant["deficit"] < 1:
+                self.ring.rotate(-1)
+    
+    def _forget_if_idle(self, username: str):
+        tenant = self.tenants.get(username)
+        if tenant is not None and tenant["in_flight"] <= 0 and username not in self.ring:
+            del self.tenants[username]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        waiting: Dict[str, int] = {}
+        for tenant in self.tenants.values():
+            count = sum(1 for lane in tenant["lanes"].values() for future in lane if not future.done())
+            waiting[tenant["tier"]] = waiting.get(tenant["tier"], 0) + count
+        
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "total_slots": self.total_slots,
+            "waiting_by_tier": waiting,
+            "tenants": len(self.tenants)
+        }
+
+class StateBackend(ABC):
+    """State shared by every worker serving the API
+    
+    Covers what must agree across processes: request counters, rate-limit
+    buckets, users (API keys travel as digests only), queued and running
+    requests with their cancel flags, finished request records for status
+    lookups and history, and each worker's latency sketches so /metrics can
+    merge them. Analytics rollups and the scheduler stay per worker.
+    
+    Methods may block; the server invokes them through `call`, which
+    blocking backends override to run off the event loop.
+    """
+    
+    shared = False
+    
+    async def call(self, method: Callable[..., Any], *args) -> Any:
+        """Run one of this backend's methods on behalf of the event loop"""
+        return method(*args)
+    
+    @abstractmethod
+    def incr(self, counters: Dict[str, float]):
+        """Add to named counters; must not block (buffer and `flush` if needed)"""
+    
+    @abstractmethod
+    def counters(self) -> Dict[str, float]:
+        """Current counter values, including this worker's unflushed increments"""
+    
+    @abstractmethod
+    def try_acquire(self, key: str, capacity: int, tokens: int = 1) -> bool:
+        """Token-bucket charge, all or nothing"""
+    
+    @abstractmethod
+    def refund(self, key: str, capacity: int, tokens: int = 1):
+        """Return tokens charged for rejected work"""
+    
+    @abstractmethod
+    def remaining(self, key: str, capacity: int) -> int:
+        """Tokens left in the bucket"""
+    
+    @abstractmethod
+    def save_user(self, user: UserModel, key_digest: bytes) -> bool:
+        """Store a new user and the digest of their API key; False if the username is taken"""
+    
+    @abstractmethod
+    def load_users(self) -> List[Tuple[UserModel, bytes]]:
+        """All stored users with their key digests"""
+    
+    def publish_active(self, request_id: str, user: str, status: str, start_time: float):
+        """Publish a queued or running request owned by this worker; must not block"""
+    
+    def clear_active(self, request_id: str):
+        """Drop an active request that ended without a record; must not block"""
+    
+    def get_active(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Active request owned by any worker: user, status and start_time"""
+        return None
+    
+    def count_active(self) -> int:
+        return 0
+    
+    def touch_active(self):
+        """Heartbeat for this worker's active requests, so others can tell them from a dead worker's"""
+    
+    def request_cancel(self, request_id: str) -> bool:
+        """Flag an active request for its owning worker to cancel; False if it is not active"""
+        return False
+    
+    def cancel_requested(self, request_ids: List[str]) -> List[str]:
+        """Which of the given requests have been flagged for cancellation"""
+        return []
+    
+    def record_request(self, record: HistoryRecord):
+        """Publish a finished request for status lookups from any worker, retiring
+        its active entry; must not block"""
+    
+    def find_request(self, request_id: str) -> Optional[HistoryRecord]:
+        return None
+    
+    def page_requests(self, cursor: Optional[int], limit: int) -> List[Tuple[int, HistoryRecord]]:
+        """Finished requests from every worker older than `cursor`, newest first, with their cursors"""
+        return []
+    
+    def requests_total(self) -> int:
+        """Finished requests recorded by every worker"""
+        return 0
+    
+    def publish_worker_stats(self, stats: Dict[str, Any]):
+        """Publish this worker's latest aggregates; must not block"""
+    
+    def worker_stats(self) -> List[Dict[str, Any]]:
+        """Latest aggregates published by the other workers, each with its `updated` time"""
+        return []
+    
+    def flush(self):
+        """Write buffered updates"""
+    
+    def close(self):
+        pass
+
+class InProcessStateBackend(StateBackend):
+    """Single-process state in plain dicts (the default)"""
+    
+    def __init__(self, rate_window: float = 3600.0):
+        self._counters: Dict[str, float] = {}
+        self.rate_limiter = TokenBucketRateLimiter(window=rate_window)
+        self.users: Dict[str, Tuple[UserModel, bytes]] = {}
+    
+    def incr(self, counters: Dict[str, float]):
+        for name, amount in counters.items():
+            self._counters[name] = self._counters.get(name, 0) + amount
+    
+    def counters(self) -> Dict[str, float]:
+        return dict(self._counters)
+    
+    def try_acquire(self, key: str, capacity: int, tokens: int = 1) -> bool:
+        return self.rate_limiter.try_acquire(key, capacity, tokens)
+    
+    def refund(self, key: str, capacity: int, tokens: int = 1):
+        self.rate_limiter.refund(key, capacity, tokens)
+    
+    def remaining(self, key: str, capacity: int) -> int:
+        return self.rate_limiter.remaining(key, capacity)
+    
+    def save_user(self, user: UserModel, key_digest: bytes) -> bool:
+        if user.username in self.users:
+            return False
+        self.users[user.username] = (user, key_digest)
+        return True
+    
+    def load_users(self) -> List[Tuple[UserModel, bytes]]:
+        return list(self.users.values())
+
+class SQLiteStateBackend(StateBackend):
+    """State shared by all workers on one host through a SQLite WAL database
+    
+    All database work runs on one thread per worker, so the event loop never
+    waits on disk or locks, and transactions on the shared connection never
+    interleave. Counter increments are summed in memory and written as one
+    upsert batch per `flush`; rate-limit buckets are read-modify-written
+    inside BEGIN IMMEDIATE, so concurrent workers never lose updates.
+    Active requests and finished records are queued to the same thread, and
+    a record replaces its active row in one transaction, so other workers
+    always see one or the other. Records are capped at `max_requests` rows,
+    pruned every PRUNE_EVERY inserts. A worker drops its active rows on
+    close; rows whose heartbeat is older than `active_ttl` (a worker that
+    crashed) are ignored by readers and pruned by the next heartbeat.
+    """
+    
+    shared = True
+    PRUNE_EVERY = 1000
+    
+    def __init__(self, path: str, rate_window: float = 3600.0, max_requests: int = 100000,
+                 active_ttl: float = 30.0):
+        self.path = path
+        self.rate_window = rate_window
+        self.max_requests = max_requests
+        self.active_ttl = active_ttl
+        self._inserts = 0
+        self.owner = uuid.uuid4().hex  # tags this worker's active rows
+        self._pending: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-db")
+        
+        # Autocommit; multi-statement updates take explicit transactions
+        self.db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, data TEXT NOT NULL, key_digest BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS requests (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, request_id TEXT UNIQUE, record TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS workers (owner TEXT PRIMARY KEY, updated REAL NOT NULL, stats TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS active (
+                request_id TEXT PRIMARY KEY, owner TEXT NOT NULL, user TEXT NOT NULL, status TEXT NOT NULL,
+                start_time REAL NOT NULL, heartbeat REAL NOT NULL, cancel INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+    
+    async def call(self, method: Callable[..., Any], *args) -> Any:
+        return await asyncio.get_event_loop().run_in_executor(self._executor, method, *args)
+    
+    def incr(self, counters: Dict[str, float]):
+        with self._pending_lock:
+            for name, amount in counters.items():
+                self._pending[name] = self._pending.get(name, 0) + amount
+    
+    def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self.db.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                list(pending.items())
+            )
+    
+    def counters(self) -> Dict[str, float]:
+        self.flush()
+        return dict(self.db.execute("SELECT name, value FROM counters").fetchall())
+    
+    def _bucket(self, key: str, capacity: int, now: float) -> float:
+        row = self.db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return float(capacity)
+        return min(capacity, row[0] + (now - row[1]) * capacity / self.rate_window)
+    
+    def _update_bucket(self, key: str, capacity: int, delta: float, all_or_nothing: bool) -> bool:
+        """Add delta tokens (negative to charge) inside one write transaction"""
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            available = self._bucket(key, capacity, now) + delta
+            granted = available >= 0 or not all_or_nothing
+            self.db.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, min(capacity, available if granted else available - delta), now)
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return granted
+    
+    def try_acquire(self, key: str, capacity: int, tokens: int = 1) -> bool:
+        return self._update_bucket(key, capacity, -tokens, all_or_nothing=True)
+    
+    def refund(self, key: str, capacity: int, tokens: int = 1):
+        self._update_bucket(key, capacity, tokens, all_or_nothing=False)
+    
+    def remaining(self, key: str, capacity: int) -> int:
+        return int(self._bucket(key, capacity, time.time()))
+    
+    def save_user(self, user: UserModel, key_digest: bytes) -> bool:
+        data = user.model_dump(mode="json", exclude={"api_key"})
+        # Never overwrite: another worker may already have created this username
+        cursor = self.db.execute(
+            "INSERT INTO users (username, data, key_digest) VALUES (?, ?, ?) "
+            "ON CONFLICT(username) DO NOTHING",
+            (user.username, json.dumps(data), key_digest)
+        )
+        return cursor.rowcount > 0
+    
+    def load_users(self) -> List[Tuple[UserModel, bytes]]:
+        # The plain-text key never leaves the worker that created the user
+        return [
+            (UserModel(api_key="", **json.loads(data)), bytes(digest))
+            for data, digest in self.db.execute("SELECT data, key_digest FROM users")
+        ]
+    
+    def publish_active(self, request_id: str, user: str, status: str, start_time: float):
+        self._submit(self._upsert_active, request_id, user, status, start_time)
+    
+    def _upsert_active(self, request_id: str, user: str, status: str, start_time: float):
+        # A cancel flag set while queued survives the move to running
+        self.db.execute(
+            "INSERT INTO active (request_id, owner, user, status, start_time, heartbeat) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(request_id) DO UPDATE SET status = excluded.status, heartbeat = excluded.heartbeat",
+            (request_id, self.owner, user, status, start_time, time.time())
+        )
+    
+    def clear_active(self, request_id: str):
+        self._submit(self.db.execute, "DELETE FROM active WHERE request_id = ?", (request_id,))
+    
+    def get_active(self, request_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute(
+            "SELECT user, status, start_time FROM active WHERE request_id = ? AND heartbeat >= ?",
+            (request_id, time.time() - self.active_ttl)
+        ).fetchone()
+        return {"user": row[0], "status": row[1], "start_time": row[2]} if row else None
+    
+    def count_active(self) -> int:
+        return self.db.execute(
+            "SELECT COUNT(*) FROM active WHERE heartbeat >= ?", (time.time() - self.active_ttl,)
+        ).fetchone()[0]
+    
+    def touch_active(self):
+        now = time.time()
+        self.db.execute("UPDATE active SET heartbeat = ? WHERE owner = ?", (now, self.owner))
+        self.db.execute("DELETE FROM active WHERE heartbeat < ?", (now - self.active_ttl,))
+    
+    def request_cancel(self, request_id: str) -> bool:
+        return self.db.execute(
+            "UPDATE active SET cancel = 1 WHERE request_id = ? AND heartbeat >= ?",
+            (request_id, time.time() - self.active_ttl)
+        ).rowcount > 0
+    
+    def cancel_requested(self, request_ids: List[str]) -> List[str]:
+        # Rows are tagged with their owner, so one query covers every request this worker runs
+        flagged = {row[0] for row in self.db.execute(
+            "SELECT request_id FROM active WHERE owner = ? AND cancel = 1", (self.owner,)
+        )}
+        return [request_id for request_id in request_ids if request_id in flagged]
+    
+    def record_request(self, record: HistoryRecord):
+        self._submit(self._insert_request, record)
+    
+    def _submit(self, method: Callable[..., Any], *args):
+        """Queue a write nobody waits for; failures are logged"""
+        def log_failure(future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.error(f"State backend write failed: {future.exception()}")
+        
+        self._executor.submit(method, *args).add_done_callback(log_failure)
+    
+    def _insert_request(self, record: HistoryRecord):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute(
+                "INSERT OR REPLACE INTO requests (request_id, record) VALUES (?, ?)",
+                (record.request_id, json.dumps(record, default=str))
+            )
+            self.db.execute("DELETE FROM active WHERE request_id = ?", (record.request_id,))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        self._inserts += 1
+        if self._inserts % self.PRUNE_EVERY == 0:
+            self.db.execute(
+                "DELETE FROM requests WHERE seq <= (SELECT MAX(seq) FROM requests) - ?",
+                (self.max_requests,)
+            )
+    
+    def find_request(self, request_id: str) -> Optional[HistoryRecord]:
+        row = self.db.execute("SELECT record FROM requests WHERE request_id = ?", (request_id,)).fetchone()
+        return HistoryRecord(*json.loads(row[0])) if row else None
+    
+    def page_requests(self, cursor: Optional[int], limit: int) -> List[Tuple[int, HistoryRecord]]:
+        rows = self.db.execute(
+            "SELECT seq, record FROM requests WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+            (cursor if cursor is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+        return [(seq, HistoryRecord(*json.loads(record))) for seq, record in rows]
+    
+    def requests_total(self) -> int:
+        # Sequence numbers keep counting after old rows are pruned
+        return self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM requests").fetchone()[0]
+    
+    def publish_worker_stats(self, stats: Dict[str, Any]):
+        self._submit(
+            self.db.execute,
+            "INSERT OR REPLACE INTO workers (owner, updated, stats) VALUES (?, ?, ?)",
+            (self.owner, time.time(), json.dumps(stats))
+        )
+    
+    def worker_stats(self) -> List[Dict[str, Any]]:
+        # Rows of stopped workers stay: their requests still belong in lifetime percentiles
+        return [
+            {**json.loads(stats), "updated": updated}
+            for updated, stats in self.db.execute("SELECT updated, stats FROM workers WHERE owner != ?", (self.owner,))
+        ]
+    
+    def close(self):
+        if self.db is None:
+            return
+        self._executor.submit(self.flush)
+        self._submit(self.db.execute, "DELETE FROM active WHERE owner = ?", (self.owner,))
+        self._executor.shutdown(wait=True)
+        self.db.close()
+        self.db = None
+
 class AdvancedAPIServer:
     """Advanced API server with enhanced features"""
     
-    def __init__(self, port: int = 8591):
+    # Simulated processing stages: (name, share of the mode's time, message)
+    PROCESSING_STAGES = (
+        ("analyzing", 0.2, "Analyzing request context..."),
+        ("reasoning", 0.6, "Executing reasoning algorithms..."),
+        ("synthesizing", 0.2, "Synthesizing results...")
+    )
+    
+    def __init__(self, port: int = 8591, history_capacity: int = 10000,
+                 history_spill_path: Optional[str] = None,
+                 max_queued_jobs: int = 10000, stream_heartbeat: float = 15.0,
+                 stream_buffer_size: int = 16, scheduler_slots: int = 64,
+                 state_backend: Optional[StateBackend] = None, state_flush_interval: float = 1.0):
         self.port = port
+        self.state_flush_interval = state_flush_interval
+        self.stream_heartbeat = stream_heartbeat
+        self.stream_buffer_size = stream_buffer_size
         self.app = FastAPI(
             title="ParallelMind Engine API",
             description="Revolutionary Parallel Logical Reasoning System",
             version="2.0.0",
             docs_url="/docs",
-            redoc_url="/redoc"
+            redoc_url="/redoc",
+            lifespan=self._lifespan
         )
         
         # Add CORS middleware
@@ -124,9 +1169,10 @@ class AdvancedAPIServer:
             allow_headers=["*"],
         )
         
-        # API state
+        # API state (counters, rate limits and users live in the state backend)
+        self.state = state_backend or InProcessStateBackend(rate_window=3600)
         self.active_requests = {}
-        self.request_history = []
+        self.request_history = RequestHistory(history_capacity, spill_path=history_spill_path)
         self.metrics = {
             "total_requests": 0,
             "successful_requests": 0,
@@ -139,6 +1185,12 @@ class AdvancedAPIServer:
             "cpu_usage_percent": 0.0
         }
         
+        self.scheduler = FairScheduler(total_slots=scheduler_slots)
+        self.jobs = JobQueue(self._run_job, max_queued=max_queued_jobs)
+        self.request_window = RequestRateWindow(window_seconds=60)
+        self.latency_sketch = DDSketch()
+        self.analytics = AnalyticsRollup()
+        
         # User management (simplified)
         self.users = {
             "demo_user": UserModel(
@@ -151,8 +1203,13 @@ class AdvancedAPIServer:
             )
         }
         
-        # Rate limiting
-        self.rate_limits = {}
+        # Authentication
+        self.authenticator = Authenticator(SECRET_KEY)
+        for existing_user in self.users.values():
+            self.authenticator.register(existing_user)
+            # Every worker seeds the same users; the first one to start stores them
+            self.state.save_user(existing_user, self.authenticator.key_digests[existing_user.username])
+        self._users_synced_at = 0.0
         
         self.start_time = time.time()
         self.setup_routes()
@@ -191,45 +1248,52 @@ class AdvancedAPIServer:
     
     async def authenticate_user(self, credentials: HTTPAuthorizationCredentials = Depends(security)) -> UserModel:
         """Authenticate user by API key or JWT token"""
-        token = credentials.credentials
-        
-        # Try JWT token first
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            username = payload.get("username")
-            if username and username in self.users:
-                return self.users[username]
-        except jwt.InvalidTokenError:
-            pass
-        
-        # Try API key
-        for user in self.users.values():
-            if user.api_key == token:
-                return user
+        username = self.authenticator.authenticate(credentials.credentials)
+        user = self.users.get(username) if username else None
+        if user is None and await self._sync_users():
+            # The user may have been created by another worker
+            username = self.authenticator.authenticate(credentials.credentials)
+            user = self.users.get(username) if username else None
+        if user is not None:
+            return user
         
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    async def check_rate_limit(self, user: UserModel) -> bool:
-        """Check if user has exceeded rate limit"""
-        current_time = time.time()
-        user_key = user.username
-        
-        if user_key not in self.rate_limits:
-            self.rate_limits[user_key] = []
-        
-        # Remove old requests (older than 1 hour)
-        self.rate_limits[user_key] = [
-            req_time for req_time in self.rate_limits[user_key]
-            if current_time - req_time < 3600
-        ]
-        
-        # Check if under limit
-        if len(self.rate_limits[user_key]) >= user.rate_limit:
-            return False
+    async def check_rate_limit(self, user: UserModel, cost: int = 1) -> bool:
+        """Check and charge the user's rate limit; a batch reserves `cost` requests at once"""
+        return await self.state.call(self.state.try_acquire, user.username, user.rate_limit, cost)
+    
+    async def refund_rate_limit(self, user: UserModel, cost: int = 1):
+        """Return rate-limit charges for requests that were rejected after the check"""
+        await self.state.call(self.state.refund, user.username, user.rate_limit, cost)
+    
+    async def _merged_latency(self) -> Tuple[DDSketch, DDSketch]:
+        """Lifetime and last-minute latency sketches, across all workers"""
+        now = time.time()
+        last_minute = self.request_window.latency.sketch(now)
+        if not self.state.shared:
+            return self.latency_sketch, last_minute
         
-        # Add current request
-        self.rate_limits[user_key].append(current_time)
-        return True
+        lifetime = DDSketch()
+        lifetime.merge(self.latency_sketch)
+        for stats in await self.state.call(self.state.worker_stats):
+            lifetime.merge(DDSketch.from_dict(stats["latency"]))
+            if now - stats["updated"] < self.request_window.window_seconds:
+                last_minute.merge(DDSketch.from_dict(stats["last_minute_latency"]))
+        return lifetime, last_minute
+    
+    def _worker_stats(self) -> Dict[str, Any]:
+        """This worker's latency sketches, as published to the state backend"""
+        return {
+            "latency": self.latency_sketch.to_dict(),
+            "last_minute_latency": self.request_window.latency.sketch(time.time()).to_dict()
+        }
+    
+    async def _count_active(self) -> int:
+        """Queued and running requests across all workers"""
+        if self.state.shared:
+            return await self.state.call(self.state.count_active)
+        return len(self.active_requests)
     
     # Health and Info Endpoints
     async def health_check(self):
@@ -267,9 +1331,27 @@ class AdvancedAPIServer:
         self.metrics["uptime_seconds"] = int(time.time() - self.start_time)
         self.metrics["memory_usage_mb"] = psutil.virtual_memory().used / (1024 * 1024)
         self.metrics["cpu_usage_percent"] = psutil.cpu_percent()
-        self.metrics["active_connections"] = len(self.active_requests)
+        self.metrics["active_connections"] = await self._count_active()
+        lifetime_latency, last_minute_latency = await self._merged_latency()
+        self.metrics["requests_per_second"] = last_minute_latency.count / self.request_window.window_seconds
         
-        return MetricsModel(**self.metrics)
+        # Request counters are shared by all workers
+        counters = await self.state.call(self.state.counters)
+        total_requests = int(counters.get("total_requests", 0))
+        self.metrics["total_requests"] = total_requests
+        self.metrics["successful_requests"] = int(counters.get("successful_requests", 0))
+        self.metrics["failed_requests"] = int(counters.get("failed_requests", 0))
+        self.metrics["average_response_time"] = (
+            counters.get("response_time_total", 0.0) / total_requests if total_requests else 0.0
+        )
+        
+        return MetricsModel(
+            **self.metrics,
+            latency_percentiles={
+                name: lifetime_latency.quantile(q)
+                for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+            }
+        )
     
     # Authentication Endpoints
     async def create_token(self, username: str, password: str):
@@ -293,6 +1375,7 @@ class AdvancedAPIServer:
             "username": user.username,
             "tier": user.tier,
             "rate_limit": user.rate_limit,
+            "rate_limit_remaining": await self.state.call(self.state.remaining, user.username, user.rate_limit),
             "valid": True
         }
     
@@ -327,102 +1410,141 @@ class AdvancedAPIServer:
             raise HTTPException(status_code=500, detail=str(e))
     
     # V2 API (Enhanced)
-    async def process_v2(self, request: RequestModel, user: UserModel = Depends(authenticate_user)):
-        """Enhanced V2 processing endpoint"""
+    async def process_v2(self, request: RequestModel, wait: bool = False,
+                         user: UserModel = Depends(authenticate_user)):
+        """Enhanced V2 processing endpoint
+        
+        Queues the request and answers 202 with its id; poll
+        /api/v2/status/{id} for the result. Pass wait=true to block for it.
+        """
+        
+        # Don't charge the rate limit for a job that cannot be queued
+        if not wait and self.jobs.full():
+            raise HTTPException(status_code=503, detail="Job queue is full")
         
         # Check rate limit
         if not await self.check_rate_limit(user):
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
         
-        start_time = time.time()
-        request_id = str(uuid.uuid4())
+        if wait:
+            return await self._process_request(request, user)
         
-        # Store active request
-        self.active_requests[request_id] = {
+        request_id = str(uuid.uuid4())
+        active = self.active_requests[request_id] = {
             "request": request,
             "user": user.username,
-            "start_time": start_time,
-            "status": "processing"
+            "start_time": time.time(),
+            "task": None
         }
         
+        if not self.jobs.submit(request_id, request, user):
+            del self.active_requests[request_id]
+            await self.refund_rate_limit(user)
+            raise HTTPException(status_code=503, detail="Job queue is full")
+        self._set_status(request_id, active, "queued")
+        if self.state.shared:
+            # Writes run in order on the state thread: once this returns, every worker can see the job
+            await self.state.call(self.state.flush)
+        
+        return JSONResponse(status_code=202, content={
+            "request_id": request_id,
+            "status": "queued",
+            "status_url": f"/api/v2/status/{request_id}",
+            "cancel_url": f"/api/v2/cancel/{request_id}"
+        })
+    
+    async def _run_job(self, request_id: str, request: RequestModel, user: UserModel):
+        """Job entry point; skips jobs cancelled before they started"""
+        if request_id in self.active_requests:
+            await self._process_request(request, user, request_id)
+    
+    async def _process_request(self, request: RequestModel, user: UserModel,
+                               request_id: Optional[str] = None,
+                               progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> ResponseModel:
+        """Process an already rate-limited request and record it
+        
+        The work runs in its own task, registered in active_requests, so
+        cancel_request can stop it mid-flight.
+        """
+        start_time = time.time()
+        request_id = request_id or str(uuid.uuid4())
+        
+        # Store active request (queued jobs keep their submission time)
+        active = self.active_requests.setdefault(request_id, {
+            "request": request,
+            "user": user.username,
+            "start_time": start_time
+        })
+        self._set_status(request_id, active, "queued")
+        
+        # Enhanced processing with mode support, once the scheduler admits it
+        task = asyncio.ensure_future(self._scheduled_process(request, request_id, user, active, progress))
+        active["task"] = task
+        
         try:
-            # Enhanced processing with mode support
-            result = await self._process_with_mode(request, request_id)
-            
-            processing_time = time.time() - start_time
-            self._update_metrics(processing_time, True)
-            
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            # No record will retire the shared entry
+            self.state.clear_active(request_id)
+            raise
+        finally:
             # Remove from active requests
-            del self.active_requests[request_id]
-            
-            response = ResponseModel(
-                request_id=request_id,
-                status="success",
-                result=result,
-                processing_time=processing_time,
-                mode=request.mode.value,
-                priority=request.priority.value,
-                timestamp=datetime.now().isoformat()
-            )
-            
-            # Add to history
-            self.request_history.append(response)
-            
-            return response
-            
-        except Exception as e:
-            processing_time = time.time() - start_time
+            self.active_requests.pop(request_id, None)
+        
+        processing_time = time.time() - start_time
+        response = ResponseModel(
+            request_id=request_id,
+            status="success",
+            processing_time=processing_time,
+            mode=request.mode.value,
+            priority=request.priority.value,
+            timestamp=datetime.now().isoformat()
+        )
+        
+        if task.cancelled():
+            response.status = "cancelled"
+        elif task.exception() is not None:
             self._update_metrics(processing_time, False)
-            
-            # Remove from active requests
-            if request_id in self.active_requests:
-                del self.active_requests[request_id]
-            
-            response = ResponseModel(
-                request_id=request_id,
-                status="error",
-                error=str(e),
-                processing_time=processing_time,
-                mode=request.mode.value,
-                priority=request.priority.value,
-                timestamp=datetime.now().isoformat()
-            )
-            
-            return response
+            response.status = "error"
+            response.error = str(task.exception())
+        else:
+            self._update_metrics(processing_time, True)
+            response.result = task.result()
+        
+        # Add to history
+        self._record_history(response, user)
+        
+        return response
     
     async def batch_process_v2(self, batch: BatchRequestModel, user: UserModel = Depends(authenticate_user)):
-        """Batch processing endpoint"""
+        """Batch processing endpoint
+        
+        With stream=true the response is NDJSON: one "result" or "error"
+        line per item in completion order, tagged with its index, then a
+        "summary" line.
+        """
         
-        # Check rate limit (count as number of requests)
-        for _ in range(len(batch.requests)):
-            if not await self.check_rate_limit(user):
-                raise HTTPException(status_code=429, detail="Rate limit exceeded")
+        # Reserve the whole batch up front (each item counts as one request)
+        if not await self.check_rate_limit(user, cost=len(batch.requests)):
+            raise HTTPException(status_code=429, detail="Rate limit exceeded")
         
         batch_id = str(uuid.uuid4())
+        
+        if batch.stream:
+            return StreamingResponse(self._stream_batch(batch, batch_id, user), media_type="application/x-ndjson")
+        
         start_time = time.time()
         
         try:
-            if batch.parallel_execution:
-                # Process in parallel with concurrency limit
-                semaphore = asyncio.Semaphore(batch.max_concurrent)
-                
-                async def process_single(req):
-                    async with semaphore:
-                        return await self.process_v2(req, user)
-                
-                results = await asyncio.gather(
-                    *[process_single(req) for req in batch.requests],
-                    return_exceptions=True
-                )
-            else:
-                # Process sequentially
-                results = []
-                for req in batch.requests:
-                    result = await self.process_v2(req, user)
-                    results.append(result)
+            results: List[Optional[ResponseModel]] = [None] * len(batch.requests)
+            async for index, result in self._iter_batch(batch, user):
+                if isinstance(result, Exception):
+                    result = self._batch_error_response(batch.requests[index], result)
+                results[index] = result
             
             # Count successful and failed
-            successful = sum(1 for r in results if not isinstance(r, Exception) and r.status == "success")
+            successful = sum(1 for r in results if r.status == "success")
             failed = len(results) - successful
             
             total_time = time.time() - start_time
@@ -433,16 +1555,100 @@ class AdvancedAPIServer:
                 successful=successful,
                 failed=failed,
                 total_processing_time=total_time,
-                results=[r for r in results if not isinstance(r, Exception)]
+                results=results
             )
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
+    async def _iter_batch(self, batch: BatchRequestModel, user: UserModel):
+        """Yield (index, ResponseModel or exception) for each item as it completes"""
+        if not batch.parallel_execution:
+            # Process sequentially
+            for index, req in enumerate(batch.requests):
+                try:
+                    yield index, await self._process_request(req, user)
+                except Exception as e:
+                    yield index, e
+            return
+        
+        # Process in parallel with concurrency limit
+        semaphore = asyncio.Semaphore(batch.max_concurrent)
+        
+        async def process_single(index: int, req: RequestModel):
+            async with semaphore:
+                try:
+                    return index, await self._process_request(req, user)
+                except Exception as e:
+                    return index, e
+        
+        tasks = [asyncio.ensure_future(process_single(i, req)) for i, req in enumerate(batch.requests)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
+    
+    async def _stream_batch(self, batch: BatchRequestModel, batch_id: str, user: UserModel):
+        """NDJSON body for streamed batches"""
+        start_time = time.time()
+        successful = failed = 0
+        
+        async for index, result in self._iter_batch(batch, user):
+            if isinstance(result, Exception):
+                failed += 1
+                line = {"type": "error", "index": index, "status": "error", "error": str(result)}
+            elif result.status == "success":
+                successful += 1
+                line = {"type": "result", "index": index, "status": "success",
+                        "response": result.model_dump(mode="json")}
+            else:
+                failed += 1
+                line = {"type": "error", "index": index, "status": result.status, "error": result.error,
+                        "response": result.model_dump(mode="json")}
+            yield json.dumps(line) + "\n"
+        
+        yield json.dumps({
+            "type": "summary",
+            "batch_id": batch_id,
+            "total_requests": len(batch.requests),
+            "successful": successful,
+            "failed": failed,
+            "total_processing_time": time.time() - start_time
+        }) + "\n"
+    
+    async def _scheduled_process(self, request: RequestModel, request_id: str, user: UserModel,
+                                 active: Dict[str, Any], progress: Optional[Callable[[Dict[str, Any]], None]]) -> Dict[str, Any]:
+        """Wait for a fair-scheduler slot, then process"""
+        async with self.scheduler.slot(user.username, user.tier, request.priority.value):
+            self._set_status(request_id, active, "running")
+            return await self._process_with_mode(request, request_id, progress)
+    
+    def _set_status(self, request_id: str, active: Dict[str, Any], status: str):
+        """Update an active request's status here and in the state backend"""
+        if active.get("status") != status:
+            active["status"] = status
+            self.state.publish_active(request_id, active["user"], status, active["start_time"])
+    
+    def _batch_error_response(self, request: RequestModel, error: Exception) -> ResponseModel:
+        """Error entry for a batch item that raised instead of returning a response"""
+        return ResponseModel(
+            request_id=str(uuid.uuid4()),
+            status="error",
+            error=str(error),
+            processing_time=0.0,
+            mode=request.mode.value,
+            priority=request.priority.value,
+            timestamp=datetime.now().isoformat()
+        )
+    
     async def get_request_status(self, request_id: str, user: UserModel = Depends(authenticate_user)):
-        """Get status of a specific request"""
-        if request_id in self.active_requests:
-            req_info = self.active_requests[request_id]
+        """Get status of a specific request: queued, running, or its finished
+        response (success, error or cancelled). Other users' requests are 404."""
+        req_info = self.active_requests.get(request_id)
+        if req_info is not None and req_info["user"] == user.username:
             return {
                 "request_id": request_id,
                 "status": req_info["status"],
@@ -450,20 +1656,60 @@ class AdvancedAPIServer:
                 "user": req_info["user"]
             }
         
-        # Check history
-        for response in self.request_history:
-            if response.request_id == request_id:
-                return response
+        # Check history, then requests queued, running or finished on other workers
+        record = self.request_history.get(request_id)
+        if record is None and self.state.shared:
+            remote = await self.state.call(self.state.get_active, request_id)
+            if remote is not None and remote["user"] == user.username:
+                return {
+                    "request_id": request_id,
+                    "status": remote["status"],
+                    "elapsed_time": time.time() - remote["start_time"],
+                    "user": remote["user"]
+                }
+            record = await self.state.call(self.state.find_request, request_id)
+        if record is not None and record.user == user.username:
+            return record.to_response()
         
         raise HTTPException(status_code=404, detail="Request not found")
     
     async def cancel_request(self, request_id: str, user: UserModel = Depends(authenticate_user)):
-        """Cancel an active request"""
-        if request_id in self.active_requests:
-            del self.active_requests[request_id]
-            return {"message": f"Request {request_id} cancelled"}
+        """Cancel one of the caller's queued or running requests
         
-        raise HTTPException(status_code=404, detail="Request not found or already completed")
+        Requests running on another worker are flagged in the state backend;
+        their worker cancels them within state_flush_interval.
+        """
+        req_info = self.active_requests.get(request_id)
+        if req_info is None and self.state.shared:
+            remote = await self.state.call(self.state.get_active, request_id)
+            if (remote is not None and remote["user"] == user.username
+                    and await self.state.call(self.state.request_cancel, request_id)):
+                return {"message": f"Request {request_id} cancelled", "previous_status": remote["status"]}
+        
+        if req_info is None or req_info["user"] != user.username:
+            raise HTTPException(status_code=404, detail="Request not found or already completed")
+        
+        self._cancel_active(request_id, req_info)
+        return {"message": f"Request {request_id} cancelled", "previous_status": req_info["status"]}
+    
+    def _cancel_active(self, request_id: str, req_info: Dict[str, Any]):
+        """Cancel a request this worker owns"""
+        if req_info["task"] is not None:
+            # Running: the processing task records the cancellation itself
+            req_info["task"].cancel()
+            return
+        
+        # Not started yet: _run_job skips it once it is gone from active_requests
+        del self.active_requests[request_id]
+        request = req_info["request"]
+        self._record_history(ResponseModel(
+            request_id=request_id,
+            status="cancelled",
+            processing_time=0.0,
+            mode=request.mode.value,
+            priority=request.priority.value,
+            timestamp=datetime.now().isoformat()
+        ), self.users[req_info["user"]])
     
     # V3 API (Advanced)
     async def process_v3(self, request: RequestModel, background_tasks: BackgroundTasks, user: UserModel = Depends(authenticate_user)):
@@ -475,81 +1721,139 @@ class AdvancedAPIServer:
         # Add background task for cleanup
         background_tasks.add_task(self._cleanup_old_requests)
         
-        return await self.process_v2(request, user)
+        return await self._process_request(request, user)
     
-    async def stream_process_v3(self, request: RequestModel, user: UserModel = Depends(authenticate_user)):
-        """Streaming processing endpoint"""
+    async def stream_process_v3(self, request: RequestModel, http_request: Request,
+                                user: UserModel = Depends(authenticate_user)):
+        """Streaming processing endpoint (Server-Sent Events)
+        
+        Emits start, progress events as processing advances, then one of
+        complete/error/cancelled. Idle gaps get keep-alive comments, and the
+        work is cancelled if the client disconnects.
+        """
         
         if not await self.check_rate_limit(user):
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
         
+        request_id = str(uuid.uuid4())
+        
+        # Bounded buffer: a slow reader loses stale progress events, never memory
+        events: asyncio.Queue = asyncio.Queue(maxsize=self.stream_buffer_size)
+        
+        def on_progress(event: Dict[str, Any]):
+            if events.full():
+                events.get_nowait()
+            events.put_nowait(event)
+        
         async def generate_stream():
-            request_id = str(uuid.uuid4())
-            
-            # Send initial response
-            yield f"data: {json.dumps({'type': 'start', 'request_id': request_id})}\n\n"
-            
-            # Simulate processing steps
-            steps = [
-                "Initializing parallel reasoning...",
-                "Analyzing request context...",
-                "Executing reasoning algorithms...",
-                "Synthesizing results...",
-                "Finalizing response..."
-            ]
-            
-            for i, step in enumerate(steps):
-                await asyncio.sleep(0.5)  # Simulate processing time
-                yield f"data: {json.dumps({'type': 'progress', 'step': i+1, 'total': len(steps), 'message': step})}\n\n"
-            
-            # Send final result
-            result = await self._process_with_mode(request, request_id)
-            yield f"data: {json.dumps({'type': 'complete', 'result': result})}\n\n"
+            task = asyncio.ensure_future(self._process_request(request, user, request_id, progress=on_progress))
+            getter: Optional[asyncio.Future] = None
+            try:
+                yield self._sse_event("start", {"type": "start", "request_id": request_id})
+                
+                while True:
+                    getter = asyncio.ensure_future(events.get())
+                    done, _ = await asyncio.wait(
+                        {getter, task}, timeout=self.stream_heartbeat, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if getter in done:
+                        yield self._sse_event("progress", {"type": "progress", **getter.result()})
+                        continue
+                    
+                    getter.cancel()
+                    if task.done():
+                        break
+                    if await http_request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                
+                response = task.result()
+                event_type = "complete" if response.status == "success" else response.status
+                yield self._sse_event(event_type, {"type": event_type, **response.model_dump(mode="json")})
+            finally:
+                # Don't leave a reader blocked on the event queue
+                if getter is not None and not getter.done():
+                    getter.cancel()
+                
+                # Client went away (or the stream was closed early): cancel the work
+                # the same way /api/v2/cancel does, so it is recorded as cancelled
+                if not task.done():
+                    active = self.active_requests.get(request_id)
+                    (active["task"] if active and active["task"] else task).cancel()
         
-        return StreamingResponse(generate_stream(), media_type="text/plain")
+        return StreamingResponse(generate_stream(), media_type="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+    
+    @staticmethod
+    def _sse_event(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
     
-    async def get_request_history(self, limit: int = 100, user: UserModel = Depends(authenticate_user)):
-        """Get request history"""
+    async def get_request_history(self, limit: int = 100, cursor: Optional[int] = None,
+                                  user: UserModel = Depends(authenticate_user)):
+        """Get request history, newest first; pass next_cursor back to page further
+        
+        With a shared state backend this covers every worker's requests.
+        """
+        limit = max(1, min(limit, 1000))
+        if self.state.shared:
+            rows = await self.state.call(self.state.page_requests, cursor, limit)
+            records = [record for _, record in rows]
+            next_cursor = rows[-1][0] if len(rows) == limit else None
+            total = await self.state.call(self.state.requests_total)
+        else:
+            records, next_cursor = self.request_history.page(cursor, limit)
+            total = self.request_history.total
         return {
-            "total": len(self.request_history),
+            "total": total,
             "limit": limit,
-            "requests": self.request_history[-limit:]
+            "requests": [record.to_response() for record in records],
+            "next_cursor": next_cursor
         }
     
-    async def get_analytics(self, user: UserModel = Depends(authenticate_user)):
-        """Get advanced analytics"""
+    async def get_analytics(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            top_users: int = 20, user: UserModel = Depends(authenticate_user)):
+        """Get advanced analytics, optionally for a [start, end) time range
+        
+        Rollups are kept per worker; with a shared state backend the response
+        is labelled with scope "worker" and covers only this worker's traffic.
+        """
         if user.tier not in ["pro", "enterprise"]:
             raise HTTPException(status_code=403, detail="Analytics requires Pro or Enterprise tier")
         
-        # Calculate analytics
-        total_requests = len(self.request_history)
-        if total_requests == 0:
+        # Read precomputed rollups
+        aggregates, resolution = self.analytics.query(
+            start.timestamp() if start else None,
+            end.timestamp() if end else None
+        )
+        overall = aggregates.overall.summary()
+        if overall["requests"] == 0:
             return {"message": "No data available"}
         
-        # Mode distribution
-        mode_counts = {}
-        response_times = []
-        
-        for response in self.request_history:
-            mode_counts[response.mode] = mode_counts.get(response.mode, 0) + 1
-            response_times.append(response.processing_time)
-        
-        # Calculate percentiles
-        response_times.sort()
-        p50 = response_times[int(len(response_times) * 0.5)] if response_times else 0
-        p95 = response_times[int(len(response_times) * 0.95)] if response_times else 0
-        p99 = response_times[int(len(response_times) * 0.99)] if response_times else 0
+        users = sorted(aggregates.by["user"].items(), key=lambda item: item[1].requests, reverse=True)
         
         return {
-            "total_requests": total_requests,
-            "mode_distribution": mode_counts,
+            "total_requests": overall["requests"],
+            "range": {
+                "start": start.isoformat() if start else None,
+                "end": end.isoformat() if end else None,
+                "resolution": resolution or "lifetime"
+            },
+            "mode_distribution": {mode: stats.requests for mode, stats in aggregates.by["mode"].items()},
+            "priority_distribution": {priority: stats.requests for priority, stats in aggregates.by["priority"].items()},
             "response_time_percentiles": {
-                "p50": p50,
-                "p95": p95,
-                "p99": p99
+                "p50": overall["p50"],
+                "p95": overall["p95"],
+                "p99": overall["p99"]
             },
-            "average_response_time": sum(response_times) / len(response_times),
-            "success_rate": sum(1 for r in self.request_history if r.status == "success") / total_requests
+            "average_response_time": overall["average_response_time"],
+            "success_rate": overall["success_rate"],
+            "modes": {mode: stats.summary() for mode, stats in aggregates.by["mode"].items()},
+            "priorities": {priority: stats.summary() for priority, stats in aggregates.by["priority"].items()},
+            "users": {name: stats.summary() for name, stats in users[:top_users]},
+            "last_minute": self.request_window.snapshot(),
+            "scope": "worker" if self.state.shared else "server"
         }
     
     # Admin Endpoints
@@ -568,7 +1872,13 @@ class AdvancedAPIServer:
         if new_user.username in self.users:
             raise HTTPException(status_code=400, detail="User already exists")
         
+        # The backend decides: the user may exist on a worker this one hasn't synced with
+        key_digest = Authenticator.digest(new_user.api_key)
+        if not await self.state.call(self.state.save_user, new_user, key_digest):
+            raise HTTPException(status_code=400, detail="User already exists")
+        
         self.users[new_user.username] = new_user
+        self.authenticator.register_digest(new_user.username, key_digest)
         return {"message": f"User {new_user.username} created successfully"}
     
     async def get_system_status(self, user: UserModel = Depends(authenticate_user)):
@@ -584,16 +1894,23 @@ class AdvancedAPIServer:
                 "memory_total_gb": psutil.virtual_memory().total / (1024**3),
                 "disk_usage_percent": psutil.disk_usage('/').percent
             },
+            "jobs": self.jobs.stats(),
+            "scheduler": self.scheduler.get_stats(),
             "api": {
-                "active_requests": len(self.active_requests),
+                "active_requests": await self._count_active(),
                 "total_users": len(self.users),
                 "uptime_seconds": int(time.time() - self.start_time)
+            },
+            "auth": {
+                **self.authenticator.stats,
+                "cached_tokens": len(self.authenticator.token_cache)
             }
         }
     
     # Helper Methods
-    async def _process_with_mode(self, request: RequestModel, request_id: str) -> Dict[str, Any]:
-        """Process request with specified mode"""
+    async def _process_with_mode(self, request: RequestModel, request_id: str,
+                                 progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Process request with specified mode, reporting each completed stage to `progress`"""
         
         # Simulate different processing modes
         mode_responses = {
@@ -617,7 +1934,16 @@ class AdvancedAPIServer:
             ProcessingMode.ENSEMBLE: 2.0
         }
         
-        await asyncio.sleep(mode_delays.get(request.mode, 1.0))
+        delay = mode_delays.get(request.mode, 1.0)
+        for step, (stage, share, message) in enumerate(self.PROCESSING_STAGES, 1):
+            await asyncio.sleep(delay * share)
+            if progress is not None:
+                progress({
+                    "stage": stage,
+                    "step": step,
+                    "total": len(self.PROCESSING_STAGES),
+                    "message": message
+                })
         
         return {
             "system": "ParallelMind Engine v2.0",
@@ -632,33 +1958,94 @@ class AdvancedAPIServer:
     
     def _update_metrics(self, processing_time: float, success: bool):
         """Update API metrics"""
-        self.metrics["total_requests"] += 1
+        self.state.incr({
+            "total_requests": 1,
+            "successful_requests" if success else "failed_requests": 1,
+            "response_time_total": processing_time
+        })
         
-        if success:
-            self.metrics["successful_requests"] += 1
-        else:
-            self.metrics["failed_requests"] += 1
+        # Windowed rate and latency aggregates; readers derive RPS from these
+        self.request_window.record(processing_time, success)
+        self.latency_sketch.add(processing_time)
+    
+    def _record_history(self, response: ResponseModel, user: UserModel):
+        """Add a finished request to the history ring buffer"""
+        record = self.request_history.add(
+            response.request_id, user.username, response.status, response.mode,
+            response.priority, response.processing_time, response.result, response.error
+        )
+        if self.state.shared:
+            self.state.record_request(record)
         
-        # Update average response time
-        current_avg = self.metrics["average_response_time"]
-        total_requests = self.metrics["total_requests"]
-        self.metrics["average_response_time"] = (
-            (current_avg * (total_requests - 1) + processing_time) / total_requests
+        # Cancellations are not outcomes; keep them out of analytics
+        if record.status == "cancelled":
+            return
+        
+        self.analytics.record(
+            record.timestamp, record.processing_time, record.status == "success",
+            mode=record.mode, priority=record.priority, user=record.user
         )
+    
+    async def _sync_users(self) -> bool:
+        """Pick up users created by other workers (at most once a second); True if any were added"""
+        now = time.time()
+        if now - self._users_synced_at < 1.0:
+            return False
+        self._users_synced_at = now
         
-        # Calculate requests per second (last minute)
-        current_time = time.time()
-        recent_requests = [
-            r for r in self.request_history 
-            if current_time - time.mktime(datetime.fromisoformat(r.timestamp.replace('Z', '+00:00')).timetuple()) < 60
-        ]
-        self.metrics["requests_per_second"] = len(recent_requests) / 60
+        added = False
+        for stored_user, key_digest in await self.state.call(self.state.load_users):
+            if stored_user.username not in self.users:
+                self.users[stored_user.username] = stored_user
+                self.authenticator.register_digest(stored_user.username, key_digest)
+                added = True
+        return added
+    
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        """Sync with the state backend periodically while the app runs; at shutdown
+        cancel outstanding jobs, then close the request history and the backend"""
+        flusher = asyncio.ensure_future(self._sync_state())
+        try:
+            yield
+        finally:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+            await self.jobs.stop()
+            if self.state.shared:
+                # Keep this worker's requests in the lifetime percentiles
+                self.state.publish_worker_stats(self._worker_stats())
+            
+            # Both block on their final writes; the backend's own thread can't wait on itself
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.request_history.close)
+            await loop.run_in_executor(None, self.state.close)
+    
+    async def _sync_state(self):
+        """Background task that, every state_flush_interval, writes buffered state
+        updates and spilled history, and cancels requests other workers flagged
+        for cancellation"""
+        while True:
+            await asyncio.sleep(self.state_flush_interval)
+            try:
+                await self._cleanup_old_requests()
+                await self.state.call(self.state.flush)
+                if self.state.shared:
+                    await self.state.call(self.state.touch_active)
+                    self.state.publish_worker_stats(self._worker_stats())
+                if self.state.shared and self.active_requests:
+                    flagged = await self.state.call(self.state.cancel_requested, list(self.active_requests))
+                    for request_id in flagged:
+                        req_info = self.active_requests.get(request_id)
+                        if req_info is not None:
+                            self._cancel_active(request_id, req_info)
+            except Exception as e:
+                logger.error(f"State sync failed: {e}")
     
     async def _cleanup_old_requests(self):
-        """Background task to cleanup old request history"""
-        # Keep only last 1000 requests
-        if len(self.request_history) > 1000:
-            self.request_history = self.request_history[-1000:]
+        """Background task to persist spilled request history"""
+        # The ring buffer bounds memory itself; only spilled records need writing
+        await asyncio.get_event_loop().run_in_executor(None, self.request_history.flush)
     
     async def start_server(self):
         """Start the API server"""
@@ -677,6 +2064,17 @@ class AdvancedAPIServer:
         
         await server.serve()
 
+def create_app():
+    """App factory for multi-worker deployments
+    
+    PARALLELMIND_STATE_DB selects the shared SQLite state, e.g.:
+        PARALLELMIND_STATE_DB=/tmp/parallelmind_state.db \\
+            uvicorn advanced_api_server:create_app --factory --workers 8 --port 8591
+    """
+    state_path = os.environ.get("PARALLELMIND_STATE_DB")
+    state_backend = SQLiteStateBackend(state_path) if state_path else None
+    return AdvancedAPIServer(state_backend=state_backend).app
+
 # Example usage
 async def main():
     """Main function to run the advanced API server"""
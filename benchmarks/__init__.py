@@ -0,0 +1 @@
+"""Offline microbenchmarks for ParallelMind Engine hot paths"""
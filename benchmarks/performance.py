@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+⏱️ Hot-Path Microbenchmarks - ParallelMind Engine
+=================================================
+Offline benchmarks for in-process hot data structures with JSON baselines
+and regression gates. No servers are started and no requests leave the process.
+
+    python benchmarks/performance.py                         # run and compare with baseline
+    python benchmarks/performance.py --save-baseline         # record a new baseline
+    python benchmarks/performance.py -k cache --threshold 0.3
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+@dataclass
+class Benchmark:
+    """A named hot path: setup() returns the operation to time"""
+    name: str
+    setup: Callable[[], Callable]
+    is_async: bool = False
+
+BENCHMARKS: List[Benchmark] = []
+
+def benchmark(name: str, is_async: bool = False):
+    """Register a benchmark setup function"""
+    def register(setup: Callable[[], Callable]) -> Callable[[], Callable]:
+        BENCHMARKS.append(Benchmark(name, setup, is_async))
+        return setup
+    return register
+
+# Benchmarks
+@benchmark("smart_cache.get_hit")
+def bench_cache_get():
+    from performance_optimizer import SmartCache
+    cache = SmartCache(max_size=2000)
+    for i in range(2000):
+        cache.put(f"request {i}", {"result": i, "steps": list(range(10))})
+    keys = [f"request {i}" for i in range(0, 2000, 7)]
+    state = {"i": 0}
+    
+    def op():
+        state["i"] = (state["i"] + 1) % len(keys)
+        cache.get(keys[state["i"]])
+    return op
+
+@benchmark("smart_cache.put")
+def bench_cache_put():
+    from performance_optimizer import SmartCache
+    cache = SmartCache(max_size=2000)
+    value = {"result": "ok", "steps": list(range(10))}
+    state = {"i": 0}
+    
+    def op():
+        state["i"] += 1
+        cache.put(f"request {state['i'] % 4000}", value)
+    return op
+
+@benchmark("optimizer._update_metrics", is_async=True)
+def bench_optimizer_metrics():
+    from performance_optimizer import PerformanceOptimizer
+    holder = {}
+    
+    async def op():
+        # aiohttp's connector needs the running loop, so build lazily inside it
+        optimizer = holder.get("optimizer")
+        if optimizer is None:
+            optimizer = holder["optimizer"] = PerformanceOptimizer()
+        optimizer._update_metrics(0.05, True)
+    return op
+
+@benchmark("api_server.check_rate_limit", is_async=True)
+def bench_rate_limit():
+    from advanced_api_server import AdvancedAPIServer
+    server = AdvancedAPIServer()
+    user = server.users["demo_user"].model_copy(update={"rate_limit": 10 ** 9})
+    
+    async def op():
+        await server.check_rate_limit(user)
+    return op
+
+@benchmark("api_server._update_metrics")
+def bench_api_metrics():
+    from advanced_api_server import AdvancedAPIServer, ResponseModel
+    server = AdvancedAPIServer()
+    user = server.users["demo_user"]
+    for i in range(1000):
+        server._record_history(ResponseModel(
+            request_id=str(i), status="success", result={"response": "ok"},
+            processing_time=0.5, mode="parallel", priority="medium",
+            timestamp=datetime.now().isoformat()
+        ), user)
+    
+    def op():
+        server._update_metrics(0.5, True)
+    return op
+
+@benchmark("reasoning_engine._update_metrics")
+def bench_reasoning_metrics():
+    from advanced_reasoning_engine import AdvancedReasoningEngine, ReasoningTask, ReasoningMode, PriorityLevel
+    engine = AdvancedReasoningEngine()
+    task = ReasoningTask(
+        id="bench", request="benchmark", mode=ReasoningMode.PARALLEL,
+        priority=PriorityLevel.MEDIUM, ai_user="bench"
+    )
+    
+    def op():
+        engine._update_metrics(task, 0.5, True)
+    return op
+
+@benchmark("monitoring_dashboard.update_metrics")
+def bench_dashboard_metrics():
+    from monitoring_dashboard import MonitoringDashboard
+    dashboard = MonitoringDashboard()
+    metrics = {
+        "total_requests": 1000, "failed_requests": 10, "requests_per_second": 50.0,
+        "average_response_time": 0.2, "memory_usage_mb": 256.0,
+        "cpu_usage_percent": 20.0, "active_connections": 5
+    }
+    
+    def op():
+        dashboard.update_metrics(metrics)
+    return op
+
+# Measurement
+async def _time_async(op: Callable, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await op()
+    return time.perf_counter() - start
+
+def _time_sync(op: Callable, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        op()
+    return time.perf_counter() - start
+
+async def _noop():
+    pass
+
+def _peak_bytes(call: Callable[[], Any], samples: int) -> float:
+    """Mean peak of memory allocated during one call (transient + retained)
+
+    Clearing the traces before each call restarts tracemalloc's peak at zero,
+    so the peak counts every byte allocated while the call ran, even if it was
+    freed again before returning.
+    """
+    total = 0
+    for _ in range(samples):
+        tracemalloc.clear_traces()
+        call()
+        total += tracemalloc.get_traced_memory()[1]
+    return total / samples
+
+def measure(bench: Benchmark, min_time: float = 0.2, repeats: int = 5) -> Dict[str, Any]:
+    """Best-of-N ops/sec plus allocated and retained bytes per op"""
+    op = bench.setup()
+    loop = asyncio.new_event_loop() if bench.is_async else None
+    
+    def timed(iterations: int) -> float:
+        if loop is not None:
+            return loop.run_until_complete(_time_async(op, iterations))
+        return _time_sync(op, iterations)
+    
+    try:
+        # Warm up and calibrate so one repeat lasts at least min_time
+        iterations = 1
+        while True:
+            elapsed = timed(iterations)
+            if elapsed >= min_time / 10 or iterations >= 10 ** 7:
+                break
+            iterations *= 10
+        iterations = max(1, int(iterations * (min_time / max(elapsed, 1e-9))))
+        
+        gc.collect()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            best = min(timed(iterations) for _ in range(repeats))
+            
+            samples = min(iterations, 1000)
+            tracemalloc.start()
+            try:
+                # Bytes allocated within a single op, minus the event loop's own cost
+                if loop is not None:
+                    peak = _peak_bytes(lambda: loop.run_until_complete(op()), samples)
+                    peak -= _peak_bytes(lambda: loop.run_until_complete(_noop()), samples)
+                else:
+                    peak = _peak_bytes(op, samples)
+                
+                # Net growth still live after a run
+                tracemalloc.clear_traces()
+                timed(samples)
+                retained = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        if loop is not None:
+            loop.close()
+    
+    return {
+        "ops_per_sec": iterations / best,
+        "ns_per_op": best / iterations * 1e9,
+        "alloc_bytes_per_op": max(0.0, peak),
+        "retained_bytes_per_op": retained / samples,
+        "iterations": iterations
+    }
+
+def run(pattern: Optional[str] = None, min_time: float = 0.2, repeats: int = 5) -> Dict[str, Any]:
+    """Run all (or matching) benchmarks; unavailable ones are reported as skipped,
+    broken ones as errors so the rest of the suite still runs"""
+    results = {}
+    for bench in BENCHMARKS:
+        if pattern and pattern not in bench.name:
+            continue
+        try:
+            results[bench.name] = measure(bench, min_time, repeats)
+        except ImportError as e:
+            results[bench.name] = {"skipped": f"missing dependency: {e.name}"}
+        except Exception as e:
+            results[bench.name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions beyond threshold (fractional) against a baseline"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or "skipped" in result or "skipped" in reference or "error" in reference:
+            continue
+        
+        if "error" in result:
+            regressions.append(f"{name}: failed ({result['error']})")
+            continue
+        
+        if result["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['ops_per_sec']:,.0f} ops/s vs baseline "
+                f"{reference['ops_per_sec']:,.0f} ({result['ops_per_sec'] / reference['ops_per_sec'] - 1:+.0%})"
+            )
+        
+        # Allow a few small objects of noise on top of the relative threshold
+        reference_bytes = reference.get("alloc_bytes_per_op")
+        if reference_bytes is not None and result["alloc_bytes_per_op"] > reference_bytes * (1 + threshold) + 128:
+            regressions.append(
+                f"{name}: {result['alloc_bytes_per_op']:,.0f} B allocated/op vs baseline {reference_bytes:,.0f}"
+            )
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite; exit status 1 on regression"""
+    parser = argparse.ArgumentParser(description="ParallelMind hot-path microbenchmarks")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats (best is kept)")
+    parser.add_argument("--json", help="Also write results to this path")
+    args = parser.parse_args(argv)
+    
+    import logging
+    logging.disable(logging.CRITICAL)
+    
+    print("⏱️  ParallelMind hot-path microbenchmarks")
+    print("=" * 78)
+    results = run(args.filter, args.min_time, args.repeats)
+    
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<40} skipped ({result['skipped']})")
+        elif "error" in result:
+            print(f"{name:<40} ERROR ({result['error']})")
+        else:
+            print(f"{name:<40} {result['ops_per_sec']:>14,.0f} ops/s "
+                  f"{result['alloc_bytes_per_op']:>9,.0f} B alloc/op {result['retained_bytes_per_op']:>9.1f} B kept/op")
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+    
+    errors = [name for name, result in results.items() if "error" in result]
+    if errors:
+        print(f"\n❌ {len(errors)} benchmark(s) failed to run: {', '.join(errors)}")
+        return 1
+    
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   • {regression}")
+        return 1
+    
+    print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+📐 Metrics Sketches - Shared ParallelMind Metric Primitives
+===========================================================
+Constant-memory quantile sketches and sliding-window counters used by the
+performance optimizer and the API server
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+class DDSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch)
+    
+    Values land in logarithmic bins, so any quantile is within
+    ``relative_accuracy`` of the true value over the whole stream, and
+    recording is a log plus a dict increment.
+    """
+    
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def add(self, value: float) -> None:
+        """Record one observation"""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+    
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return 0.0
+        
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return min(2 * self.gamma ** key / (self.gamma + 1), self.max)
+        
+        return self.max
+    
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state, e.g. to merge sketches across processes"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "bins": self.bins,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "max": self.max
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], data["min_value"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}  # JSON keys are strings
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.max = data["max"]
+        return sketch
+    
+    def merge(self, other: "DDSketch") -> None:
+        """Fold another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+class WindowedCounter:
+    """Sliding-window event counter backed by per-second buckets in a ring"""
+    
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.counts = [0] * window_seconds
+        self.stamps = [0] * window_seconds
+    
+    def _slot(self, now: float) -> int:
+        """Ring index for time now, resetting the bucket when its second has passed"""
+        second = int(now)
+        index = second % self.window_seconds
+        if self.stamps[index] != second:
+            self.stamps[index] = second
+            self._reset(index)
+        return index
+    
+    def _reset(self, index: int) -> None:
+        self.counts[index] = 0
+    
+    def _live(self, now: float) -> List[int]:
+        oldest = int(now) - self.window_seconds
+        return [index for index, stamp in enumerate(self.stamps) if stamp > oldest]
+    
+    def add(self, now: float, amount: int = 1) -> None:
+        """Count an event at time now (O(1))"""
+        self.counts[self._slot(now)] += amount
+    
+    def total(self, now: float) -> int:
+        """Events in the last window_seconds"""
+        return sum(self.counts[index] for index in self._live(now))
+    
+    def rate(self, now: float) -> float:
+        """Events per second over the window"""
+        return self.total(now) / self.window_seconds
+
+class WindowedSketch(WindowedCounter):
+    """Sliding window of per-second DDSketches: counts plus latency quantiles"""
+    
+    def __init__(self, window_seconds: int = 60, relative_accuracy: float = 0.01):
+        super().__init__(window_seconds)
+        self.relative_accuracy = relative_accuracy
+        self.sketches: List[Optional[DDSketch]] = [None] * window_seconds
+    
+    def _reset(self, index: int) -> None:
+        super()._reset(index)
+        self.sketches[index] = DDSketch(self.relative_accuracy)
+    
+    def observe(self, now: float, value: float) -> None:
+        """Count one event at time now and record its value (O(1))"""
+        index = self._slot(now)
+        self.counts[index] += 1
+        self.sketches[index].add(value)
+    
+    def sketch(self, now: float) -> DDSketch:
+        """Merged sketch of the last window_seconds"""
+        merged = DDSketch(self.relative_accuracy)
+        for index in self._live(now):
+            merged.merge(self.sketches[index])
+        return merged
@@ -55,6 +55,7 @@ setup(
         ],
         "performance": [
             "psutil>=5.9.0",
+            "xxhash>=3.4.1",
             "memory-profiler>=0.61.0",
             "line-profiler>=4.0.0",
         ],
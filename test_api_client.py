@@ -87,8 +87,16 @@ async def test_parallelmind_apis():
             
             start_time = time.time()
             async with session.post(f"{base_url}/api/v2/process", json=payload, headers=headers) as response:
-                if response.status == 200:
-                    v2_data = await response.json()
+                if response.status == 202:
+                    # Queued as a job: poll its status until it finishes
+                    job = await response.json()
+                    print(f"   ✅ Queued job: {job['request_id'][:8]}...")
+                    while True:
+                        async with session.get(f"{base_url}{job['status_url']}", headers=headers) as status_response:
+                            v2_data = await status_response.json()
+                        if v2_data["status"] not in ("queued", "running"):
+                            break
+                        await asyncio.sleep(0.1)
                     processing_time = time.time() - start_time
                     
                     print(f"   ✅ Status: {v2_data['status']}")
@@ -154,7 +162,8 @@ async def test_parallelmind_apis():
                 headers = {"Authorization": "Bearer pm_demo_key_2025"}
                 
                 start_time = time.time()
-                async with session.post(f"{base_url}/api/v2/process", json=payload, headers=headers) as response:
+                async with session.post(f"{base_url}/api/v2/process", params={"wait": "true"},
+                                        json=payload, headers=headers) as response:
                     if response.status == 200:
                         mode_data = await response.json()
                         processing_time = time.time() - start_time
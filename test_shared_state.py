@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+🗄️ Shared State Tests
+Two AdvancedAPIServer workers sharing one SQLiteStateBackend database
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from advanced_api_server import AdvancedAPIServer, RequestModel, SQLiteStateBackend, UserModel
+
+
+def _user(name, tier="pro", api_key=None, email=None):
+    return UserModel(username=name, email=email or f"{name}@example.com", tier=tier,
+                     api_key=api_key or name, rate_limit=10 ** 6, created_at=datetime.now())
+
+
+def _worker(path, **backend_options):
+    server = AdvancedAPIServer(state_backend=SQLiteStateBackend(str(path), **backend_options),
+                               state_flush_interval=0.05)
+    
+    async def process(request, request_id, progress=None):
+        await asyncio.sleep(10)
+        return {}
+    
+    server._process_with_mode = process
+    return server
+
+
+async def _submit(server, user):
+    response = await server.process_v2(RequestModel(request="x", ai_user=user.username), user=user)
+    return json.loads(response.body)["request_id"]
+
+
+async def _authenticate(server, api_key):
+    server._users_synced_at = 0.0
+    return await server.authenticate_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=api_key))
+
+
+def test_duplicate_user_on_another_worker_is_rejected(tmp_path):
+    async def scenario():
+        workers = [_worker(tmp_path / "state.db") for _ in range(3)]
+        admin = _user("boss", tier="enterprise")
+        
+        await workers[0].create_user(_user("carol", api_key="key_a", email="a@example.com"), user=admin)
+        with pytest.raises(HTTPException) as rejected:
+            await workers[1].create_user(_user("carol", api_key="key_b", email="b@example.com"), user=admin)
+        assert rejected.value.status_code == 400
+        
+        # Every worker still knows carol by the first key only
+        for worker in workers:
+            assert (await _authenticate(worker, "key_a")).email == "a@example.com"
+            with pytest.raises(HTTPException):
+                await _authenticate(worker, "key_b")
+        
+        for worker in workers:
+            worker.state.close()
+    
+    asyncio.run(scenario())
+
+
+def test_shutdown_drops_active_rows(tmp_path):
+    async def scenario():
+        owner, other = _worker(tmp_path / "state.db"), _worker(tmp_path / "state.db")
+        user = _user("dave")
+        
+        async with owner._lifespan(owner.app):
+            request_id = await _submit(owner, user)
+            await asyncio.sleep(0.1)
+            assert (await other.get_request_status(request_id, user=user))["status"] == "running"
+            assert await other._count_active() == 1
+        
+        with pytest.raises(HTTPException):
+            await other.get_request_status(request_id, user=user)
+        assert await other._count_active() == 0
+        other.state.close()
+    
+    asyncio.run(scenario())
+
+
+def test_rows_of_a_dead_worker_expire(tmp_path):
+    async def scenario():
+        # The owner never runs its lifespan, so nothing refreshes its rows (as if it crashed)
+        owner = _worker(tmp_path / "state.db")
+        other = _worker(tmp_path / "state.db", active_ttl=0.2)
+        user = _user("erin")
+        
+        request_id = await _submit(owner, user)
+        await asyncio.sleep(0.05)
+        assert (await other.get_request_status(request_id, user=user))["status"] == "running"
+        
+        await asyncio.sleep(0.3)
+        with pytest.raises(HTTPException):
+            await other.get_request_status(request_id, user=user)
+        with pytest.raises(HTTPException):
+            await other.cancel_request(request_id, user=user)
+        assert await other._count_active() == 0
+        
+        # The next heartbeat prunes the stale row
+        await other.state.call(other.state.touch_active)
+        rows = await other.state.call(lambda: other.state.db.execute("SELECT COUNT(*) FROM active").fetchone()[0])
+        assert rows == 0
+        
+        await owner.jobs.stop()
+        owner.state.close()
+        other.state.close()
+    
+    asyncio.run(scenario())
+
+
+def test_metrics_and_history_cover_every_worker(tmp_path):
+    async def scenario():
+        workers = [_worker(tmp_path / "state.db") for _ in range(2)]
+        user = _user("frank")
+        
+        async def process(request, request_id, progress=None):
+            return {}
+        
+        for worker in workers:
+            worker._process_with_mode = process
+        
+        async with workers[0]._lifespan(workers[0].app), workers[1]._lifespan(workers[1].app):
+            for index, worker in enumerate(workers):
+                for _ in range(3 * (index + 1)):
+                    await worker._process_request(RequestModel(request="x", ai_user=user.username), user)
+            # Let both sync loops publish
+            await asyncio.sleep(0.2)
+            
+            for worker in workers:
+                metrics = await worker.get_metrics()
+                assert metrics.total_requests == 9
+                assert metrics.requests_per_second == 9 / worker.request_window.window_seconds
+                
+                first = await worker.get_request_history(limit=5, user=user)
+                second = await worker.get_request_history(limit=5, cursor=first["next_cursor"], user=user)
+                assert first["total"] == 9
+                assert len(first["requests"]) == 5 and len(second["requests"]) == 4
+                assert second["next_cursor"] is None
+            
+            analytics = await workers[0].get_analytics(user=user)
+            assert analytics["scope"] == "worker"
+            assert analytics["total_requests"] == 3
+    
+    asyncio.run(scenario())